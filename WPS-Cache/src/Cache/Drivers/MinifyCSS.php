@@ -7,6 +7,7 @@ namespace WPSCache\Cache\Drivers;
 final class MinifyCSS extends AbstractCacheDriver
 {
     private const MAX_FILE_SIZE = 1024 * 1024;
+    private const MAX_MEMO_BYTES = 1024 * 1024;
     private const T_WHITESPACE = 0;
     private const T_COMMENT = 1;
     private const T_STRING = 2;
@@ -18,6 +19,57 @@ final class MinifyCSS extends AbstractCacheDriver
     private const T_PAREN_CLOSE = 8;
     private const T_OPERATOR = 9;
     private const T_WORD = 10;
+    // Single pass lexer. Every alternative ends in a (*MARK) naming its
+    // T_* token type, so preg_match_all reports the types with the values.
+    // Quantifiers are possessive and the comment body is unrolled, so the
+    // PCRE JIT runs each token as a straight scan without backtrack frames.
+    // Whitespace swallows any adjacent comments that are not /*! ones, and
+    // runs of such comments are one token, since the minifier drops both.
+    // Those keep their text: ending them in \K would make them empty
+    // matches, and preg_match_all retries an empty match anchored, which
+    // PCRE2 runs without the JIT.
+    private const TOKEN_REGEX =
+        '#(?:' .
+        self::DROPPED_COMMENT_REGEX .
+        ')*+[ \t\n\r\x0B\f]++(?:[ \t\n\r\x0B\f]++|' .
+        self::DROPPED_COMMENT_REGEX .
+        ')*+(*MARK:0)' .
+        '|(?:' .
+        self::DROPPED_COMMENT_REGEX .
+        ')++(*MARK:1)' .
+        '|/\*[^*]*+(?:\*++(?!/)[^*]*+)*+(?:\*++/|\z)(*MARK:1)' .
+        '|"(?:[^"\\\\\n]++|\\\\[\s\S]?)*+"?(*MARK:2)' .
+        '|\'(?:[^\'\\\\\n]++|\\\\[\s\S]?)*+\'?(*MARK:2)' .
+        '|\{(*MARK:3)' .
+        '|\}(*MARK:4)' .
+        '|:(*MARK:5)' .
+        '|;(*MARK:6)' .
+        '|\((*MARK:7)' .
+        '|\)(*MARK:8)' .
+        '|[,>+~](*MARK:9)' .
+        '|(?:[^ \t\n\r\x0B\f{}():;,\'"+>~/]++|/(?!\*))++(*MARK:10)#';
+    private const DROPPED_COMMENT_REGEX = '/\*(?!!)[^*]*+(?:\*++(?!/)[^*]*+)*+(?:\*++/|\z)';
+    // Bits of the minifyCSS $state flags
+    private const S_PENDING_SEMICOLON = 1;
+    private const S_WHITESPACE_SKIPPED = 2;
+    private const S_IN_CALC = 4;
+    private const SPACE_NEVER = 0;
+    private const SPACE_ALWAYS = 1;
+    private const SPACE_AFTER_PAREN = 2;
+    private const SPACE_BEFORE_PAREN = 3;
+    // SPACE_RULES[previous type][current type]. Pairs that are not listed
+    // never need a space between them outside of calc().
+    private const SPACE_RULES = [
+        self::T_WORD => [
+            self::T_WORD => self::SPACE_ALWAYS,
+            self::T_PAREN_OPEN => self::SPACE_BEFORE_PAREN,
+        ],
+        self::T_PAREN_CLOSE => [
+            self::T_WORD => self::SPACE_AFTER_PAREN,
+        ],
+    ];
+    // Used by scanTokens(), the fallback for when PCRE cannot run the regex
+    private const WHITESPACE_MASK = " \t\n\r\v\f";
     private const TOKENIZER_MASK = " \t\n\r\v\f{}():;,'\">+~/";
     private const TOKEN_MAP = [
         "{" => self::T_OPEN,
@@ -31,31 +83,61 @@ final class MinifyCSS extends AbstractCacheDriver
         "+" => self::T_OPERATOR,
         "~" => self::T_OPERATOR,
     ];
-    private const SELECTOR_PSEUDOS = [
-        "not" => true,
-        "is" => true,
-        "where" => true,
-        "has" => true,
-        "nth-child" => true,
-        "nth-last-child" => true,
-        "nth-of-type" => true,
-        "nth-last-of-type" => true,
-        "dir" => true,
-        "lang" => true,
-        "host" => true,
-        "host-context" => true,
-        "part" => true,
-        "slotted" => true,
-        "matches" => true,
-        "cue" => true,
+    // Functions tracked across parentheses, by id. 0 stands for any
+    // other function.
+    private const FUNCTION_IDS = [
+        "calc" => 1,
+        "clamp" => 2,
+        "min" => 3,
+        "max" => 4,
+        "var" => 5,
+        "not" => 6,
+        "is" => 7,
+        "where" => 8,
+        "has" => 9,
+        "nth-child" => 10,
+        "nth-last-child" => 11,
+        "nth-of-type" => 12,
+        "nth-last-of-type" => 13,
+        "dir" => 14,
+        "lang" => 15,
+        "host" => 16,
+        "host-context" => 17,
+        "part" => 18,
+        "slotted" => 19,
+        "matches" => 20,
+        "cue" => 21,
     ];
-    private const CALC_FUNCTIONS = [
-        "calc" => true,
-        "clamp" => true,
-        "min" => true,
-        "max" => true,
-        "var" => true,
+    // Bit n is set when FUNCTION_IDS id n belongs to the group
+    private const CALC_FUNCTION_MASK =
+        (1 << self::FUNCTION_IDS["calc"]) |
+        (1 << self::FUNCTION_IDS["clamp"]) |
+        (1 << self::FUNCTION_IDS["min"]) |
+        (1 << self::FUNCTION_IDS["max"]) |
+        (1 << self::FUNCTION_IDS["var"]);
+    private const SELECTOR_PSEUDO_MASK =
+        (1 << self::FUNCTION_IDS["not"]) |
+        (1 << self::FUNCTION_IDS["is"]) |
+        (1 << self::FUNCTION_IDS["where"]) |
+        (1 << self::FUNCTION_IDS["has"]) |
+        (1 << self::FUNCTION_IDS["nth-child"]) |
+        (1 << self::FUNCTION_IDS["nth-last-child"]) |
+        (1 << self::FUNCTION_IDS["nth-of-type"]) |
+        (1 << self::FUNCTION_IDS["nth-last-of-type"]) |
+        (1 << self::FUNCTION_IDS["dir"]) |
+        (1 << self::FUNCTION_IDS["lang"]) |
+        (1 << self::FUNCTION_IDS["host"]) |
+        (1 << self::FUNCTION_IDS["host-context"]) |
+        (1 << self::FUNCTION_IDS["part"]) |
+        (1 << self::FUNCTION_IDS["slotted"]) |
+        (1 << self::FUNCTION_IDS["matches"]) |
+        (1 << self::FUNCTION_IDS["cue"]);
+    private const MEDIA_QUERY_KEYWORDS = [
+        "and" => true,
+        "or" => true,
+        "not" => true,
     ];
+    private const UNIT_CHARS = "abcdefghijklmnopqrstuvwxyzABCDEFGHIJKLMNOPQRSTUVWXYZ%";
     private const PRESERVED_UNITS = [
         "s" => true,
         "ms" => true,
@@ -69,6 +151,10 @@ final class MinifyCSS extends AbstractCacheDriver
 
     private string $cache_dir;
     private string $exclusionRegex = "";
+    // minifyCSS results for this request, keyed by content hash, and
+    // their total length
+    private array $minified = [];
+    private int $minifiedBytes = 0;
 
     public function __construct()
     {
@@ -125,12 +211,22 @@ final class MinifyCSS extends AbstractCacheDriver
         if (empty($wp_styles->queue)) {
             return;
         }
+        // Resolve per-request values once for the whole queue. Handles are
+        // looked up in a flipped map instead of scanning the list per style.
+        $siteUrl = site_url();
         // Changed key
-        $excluded = $this->settings["excluded_css_minify"] ?? [];
+        $excluded = array_flip(
+            $this->settings["excluded_css_minify"] ?? [],
+        );
 
         foreach ($wp_styles->queue as $handle) {
             try {
-                $this->processStyle($handle, $wp_styles, $excluded);
+                $this->processStyle(
+                    $handle,
+                    $wp_styles,
+                    $excluded,
+                    $siteUrl,
+                );
             } catch (\Throwable $e) {
             }
         }
@@ -140,16 +236,19 @@ final class MinifyCSS extends AbstractCacheDriver
         string $handle,
         \WP_Styles $wp_styles,
         array $excluded,
+        string $siteUrl,
     ): void {
         if (!isset($wp_styles->registered[$handle])) {
             return;
         }
         $style = $wp_styles->registered[$handle];
-        if (!$this->shouldProcessStyle($style, $handle, $excluded)) {
+        if (
+            !$this->shouldProcessStyle($style, $handle, $excluded, $siteUrl)
+        ) {
             return;
         }
 
-        $source = $this->getSourcePath($style);
+        $source = $this->getSourcePath($style, $siteUrl);
         if (
             !$source ||
             !is_readable($source) ||
@@ -166,122 +265,240 @@ final class MinifyCSS extends AbstractCacheDriver
         if (!file_exists($cache_file)) {
             $content = file_get_contents($source);
             if ($content) {
-                $this->set($cache_key, $this->minifyCSS($content));
+                $this->set($cache_key, $this->minifyCached($content));
             }
         }
         if (file_exists($cache_file)) {
-            $this->updateStyleRegistration($style, $cache_file);
+            $this->updateStyleRegistration($style, $cache_file, $siteUrl);
+        }
+    }
+
+    /**
+     * Minifies through a per-request memo so identical stylesheets
+     * enqueued under different handles or paths are only minified once.
+     */
+    private function minifyCached(string $css): string
+    {
+        $hash = hash("xxh3", $css);
+        if (isset($this->minified[$hash])) {
+            return $this->minified[$hash];
+        }
+        $result = $this->minifyCSS($css);
+        $size = strlen($result);
+        if ($size > self::MAX_MEMO_BYTES) {
+            return $result;
         }
+        // FIFO eviction keeps the held results within MAX_MEMO_BYTES
+        while ($this->minifiedBytes + $size > self::MAX_MEMO_BYTES) {
+            $first = array_key_first($this->minified);
+            $this->minifiedBytes -= strlen($this->minified[$first]);
+            unset($this->minified[$first]);
+        }
+        $this->minifiedBytes += $size;
+        return $this->minified[$hash] = $result;
     }
 
     private function minifyCSS(string $css): string
     {
-        $buffer = [];
-        $prevToken = null;
-        $prevPrevToken = null;
+        $out = "";
+        $prevType = null;
+        $prevValue = "";
+        $prevPrevType = null;
+        // SPACE_RULES row of the previous token, empty before the first one
+        $spaceRow = [];
+        $state = 0;
         $calcDepth = 0;
-        $pendingSemicolon = false;
         $parenStack = [];
-        $lastClosedFunc = null;
-        $whitespaceSkipped = false;
+        $parenDepth = 0;
+        $lastClosedFid = 0;
+        $func = null;
 
-        foreach ($this->tokenize($css) as $token) {
-            if ($token["type"] === self::T_COMMENT) {
-                if (str_starts_with($token["value"], "/*!")) {
-                    if ($pendingSemicolon) {
-                        $buffer[] = ";";
-                        $pendingSemicolon = false;
+        [$types, $values] = $this->tokenize($css);
+        foreach ($values as $k => $value) {
+            $type = (int) $types[$k];
+            if ($type === self::T_COMMENT) {
+                if (str_starts_with($value, "/*!")) {
+                    if ($state & self::S_PENDING_SEMICOLON) {
+                        $out .= ";";
+                        $state &= ~self::S_PENDING_SEMICOLON;
                     }
-                    $buffer[] = $token["value"];
-                    $prevToken = ["type" => self::T_WHITESPACE, "value" => " "];
+                    $out .= $value;
+                    $prevType = self::T_WHITESPACE;
+                    $prevValue = " ";
+                    $spaceRow = [];
                 }
                 continue;
             }
-            if ($token["type"] === self::T_WHITESPACE) {
-                $whitespaceSkipped = true;
+            if ($type === self::T_WHITESPACE) {
+                $state |= self::S_WHITESPACE_SKIPPED;
                 continue;
             }
-            if ($pendingSemicolon) {
-                if ($token["type"] !== self::T_CLOSE) {
-                    $buffer[] = ";";
+            if ($state & self::S_PENDING_SEMICOLON) {
+                if ($type !== self::T_CLOSE) {
+                    $out .= ";";
                 }
-                $pendingSemicolon = false;
+                $state &= ~self::S_PENDING_SEMICOLON;
             }
-            if ($token["type"] === self::T_SEMICOLON) {
-                $pendingSemicolon = true;
+            if ($type === self::T_SEMICOLON) {
+                $state |= self::S_PENDING_SEMICOLON;
                 continue;
             }
 
-            if ($token["type"] === self::T_PAREN_OPEN) {
+            if ($type === self::T_PAREN_OPEN) {
                 $func = null;
-                if ($prevToken && $prevToken["type"] === self::T_WORD) {
-                    $func = strtolower($prevToken["value"]);
-                    if (isset(self::CALC_FUNCTIONS[$func])) {
-                        $calcDepth++;
-                    } elseif ($calcDepth > 0) {
-                        $calcDepth++;
+                $fid = 0;
+                if ($prevType === self::T_WORD) {
+                    // Tracked names are nearly always written in lowercase,
+                    // so only lowercase the word when the exact lookup misses.
+                    $func = $prevValue;
+                    $fid = self::FUNCTION_IDS[$func] ?? 0;
+                    if ($fid === 0) {
+                        $func = strtolower($func);
+                        $fid = self::FUNCTION_IDS[$func] ?? 0;
                     }
-                } elseif ($calcDepth > 0) {
+                }
+                if (
+                    $calcDepth > 0 ||
+                    ((self::CALC_FUNCTION_MASK >> $fid) & 1) === 1
+                ) {
                     $calcDepth++;
+                    $state |= self::S_IN_CALC;
                 }
-                $parenStack[] = $func;
+                $parenStack[$parenDepth++] = $fid;
             }
-            if ($token["type"] === self::T_PAREN_CLOSE) {
-                if ($calcDepth > 0) {
-                    $calcDepth--;
+            if ($type === self::T_PAREN_CLOSE) {
+                if ($calcDepth > 0 && --$calcDepth === 0) {
+                    $state &= ~self::S_IN_CALC;
                 }
-                $lastClosedFunc = array_pop($parenStack);
+                $lastClosedFid =
+                    $parenDepth > 0 ? $parenStack[--$parenDepth] : 0;
             }
-            if (
-                $token["type"] === self::T_WORD &&
-                $calcDepth === 0 &&
-                ($token["value"][0] ?? "") === "0"
-            ) {
-                $token["value"] = $this->optimizeZeroUnits($token["value"]);
+            if ($type === self::T_WORD) {
+                // Words are never empty; read the first byte once and leave
+                // a bare "0" alone since it has no unit to drop.
+                $first = $value[0];
+                if ($first === "0") {
+                    if (!($state & self::S_IN_CALC) && isset($value[1])) {
+                        $value = $this->optimizeZeroUnits($value);
+                    }
+                } elseif ($first === "#") {
+                    $value = $this->compressHex($value);
+                }
             }
-            if (
-                $token["type"] === self::T_WORD &&
-                ($token["value"][0] ?? "") === "#"
-            ) {
-                $token["value"] = $this->compressHex($token["value"]);
+            // Rules in order of how often they apply; the calc() signs are
+            // only inspected inside calc()
+            $rule = $spaceRow[$type] ?? self::SPACE_NEVER;
+            if ($rule === self::SPACE_NEVER) {
+                $space = false;
+            } elseif ($rule === self::SPACE_ALWAYS) {
+                $space = true;
+            } elseif ($rule === self::SPACE_AFTER_PAREN) {
+                // ":not(.a).b" must stay glued, "url(a) no-repeat" must not
+                $space =
+                    ($state & self::S_WHITESPACE_SKIPPED) !== 0 ||
+                    $lastClosedFid === 0 ||
+                    ((self::SELECTOR_PSEUDO_MASK >> $lastClosedFid) & 1) === 0;
+            } else {
+                // "and (" keeps its space; the "not" of ":not(" does not.
+                // $func is the lowercased word the "(" was opened on.
+                $space =
+                    isset(self::MEDIA_QUERY_KEYWORDS[$func]) &&
+                    !($func === "not" && $prevPrevType === self::T_COLON);
             }
             if (
-                $prevToken &&
-                $this->needsSpace(
-                    $prevToken,
-                    $token,
-                    $calcDepth > 0,
-                    $lastClosedFunc,
-                    $prevPrevToken,
-                    $whitespaceSkipped,
-                )
+                $space ||
+                (($state & self::S_IN_CALC) &&
+                    ($value === "+" ||
+                        $value === "-" ||
+                        $prevValue === "+" ||
+                        $prevValue === "-"))
             ) {
-                $buffer[] = " ";
+                $out .= " ";
             }
-            $buffer[] = $token["value"];
-            $prevPrevToken = $prevToken;
-            $prevToken = $token;
-            $whitespaceSkipped = false;
+            $out .= $value;
+            $prevPrevType = $prevType;
+            $prevType = $type;
+            $prevValue = $value;
+            $spaceRow = self::SPACE_RULES[$type] ?? [];
+            $state &= ~self::S_WHITESPACE_SKIPPED;
+        }
+        if ($state & self::S_PENDING_SEMICOLON) {
+            $out .= ";";
+        }
+        return $out ?: $css;
+    }
+
+    /**
+     * Splits the stylesheet into parallel lists of token types and values.
+     * Types are the numeric (*MARK) strings, or ints from the fallback
+     * scanner; callers cast them to int.
+     *
+     * @return array{0: array<string|int>, 1: string[]} [types, values]
+     */
+    private function tokenize(string $css): array
+    {
+        $count = preg_match_all(self::TOKEN_REGEX, $css, $m);
+        if ($count === false) {
+            // e.g. the JIT stack limit on a long data URI. Returning no
+            // tokens would store the stylesheet unminified.
+            $this->logError(
+                "CSS tokenizer regex failed, using fallback scanner: " .
+                    preg_last_error_msg(),
+            );
+            return $this->scanTokens($css);
         }
-        if ($pendingSemicolon) {
-            $buffer[] = ";";
+        if ($count === 0) {
+            return [[], []];
         }
-        return implode("", $buffer) ?: $css;
+        return [$m["MARK"], $m[0]];
     }
 
-    private function tokenize(string $css): \Generator
+    /**
+     * Byte scanner producing the same tokens as TOKEN_REGEX, for when PCRE
+     * cannot run the pattern. Any change to either lexer must be made to
+     * both; tools/check-css-lexers.php compares them.
+     *
+     * @return array{0: int[], 1: string[]} [types, values]
+     */
+    private function scanTokens(string $css): array
     {
+        $types = [];
+        $values = [];
         $len = strlen($css);
         $i = 0;
         while ($i < $len) {
-            $char = $css[$i];
-            if (ctype_space($char)) {
-                $i += strspn($css, " \t\n\r\v\f", $i);
-                yield ["type" => self::T_WHITESPACE, "value" => " "];
+            // Whitespace and comments other than /*! merge into one token
+            $start = $i;
+            $skippedSpace = false;
+            while ($i < $len) {
+                $ws = strspn($css, self::WHITESPACE_MASK, $i);
+                if ($ws > 0) {
+                    $i += $ws;
+                    $skippedSpace = true;
+                    continue;
+                }
+                if (
+                    $css[$i] === "/" &&
+                    ($css[$i + 1] ?? "") === "*" &&
+                    ($css[$i + 2] ?? "") !== "!"
+                ) {
+                    $end = strpos($css, "*/", $i + 2);
+                    $i = $end === false ? $len : $end + 2;
+                    continue;
+                }
+                break;
+            }
+            if ($i > $start) {
+                $types[] = $skippedSpace
+                    ? self::T_WHITESPACE
+                    : self::T_COMMENT;
+                $values[] = substr($css, $start, $i - $start);
                 continue;
             }
+
+            $char = $css[$i];
             if ($char === '"' || $char === "'") {
-                $start = $i++;
+                $i++;
                 $mask = "\\\n" . $char;
                 while ($i < $len) {
                     $i += strcspn($css, $mask, $i);
@@ -301,28 +518,24 @@ final class MinifyCSS extends AbstractCacheDriver
                         break;
                     }
                 }
-                yield [
-                    "type" => self::T_STRING,
-                    "value" => substr($css, $start, $i - $start),
-                ];
+                $types[] = self::T_STRING;
+                $values[] = substr($css, $start, $i - $start);
                 continue;
             }
             if ($char === "/" && ($css[$i + 1] ?? "") === "*") {
-                $start = $i;
+                // Only /*! comments reach this point
                 $end = strpos($css, "*/", $i + 2);
                 $i = $end === false ? $len : $end + 2;
-                yield [
-                    "type" => self::T_COMMENT,
-                    "value" => substr($css, $start, $i - $start),
-                ];
+                $types[] = self::T_COMMENT;
+                $values[] = substr($css, $start, $i - $start);
                 continue;
             }
             if (isset(self::TOKEN_MAP[$char])) {
-                yield ["type" => self::TOKEN_MAP[$char], "value" => $char];
+                $types[] = self::TOKEN_MAP[$char];
+                $values[] = $char;
                 $i++;
                 continue;
             }
-            $start = $i;
             while ($i < $len) {
                 $i += strcspn($css, self::TOKENIZER_MASK, $i);
                 if ($i >= $len) {
@@ -336,58 +549,10 @@ final class MinifyCSS extends AbstractCacheDriver
                 }
                 $i++;
             }
-            yield [
-                "type" => self::T_WORD,
-                "value" => substr($css, $start, $i - $start),
-            ];
-        }
-    }
-
-    private function needsSpace(
-        array $prev,
-        array $curr,
-        bool $inCalc,
-        ?string $last,
-        ?array $pp,
-        bool $skipped,
-    ): bool {
-        if (
-            $inCalc &&
-            ($curr["value"] === "+" ||
-                $curr["value"] === "-" ||
-                $prev["value"] === "+" ||
-                $prev["value"] === "-")
-        ) {
-            return true;
-        }
-        if ($prev["type"] === self::T_WORD && $curr["type"] === self::T_WORD) {
-            return true;
-        }
-        if (
-            $prev["type"] === self::T_PAREN_CLOSE &&
-            $curr["type"] === self::T_WORD
-        ) {
-            if ($skipped) {
-                return true;
-            }
-            if ($last && isset(self::SELECTOR_PSEUDOS[$last])) {
-                return false;
-            }
-            return true;
-        }
-        if (
-            $prev["type"] === self::T_WORD &&
-            $curr["type"] === self::T_PAREN_OPEN
-        ) {
-            $v = strtolower($prev["value"]);
-            if ($v === "and" || $v === "or" || $v === "not") {
-                if ($v === "not" && $pp && $pp["type"] === self::T_COLON) {
-                    return false;
-                }
-                return true;
-            }
+            $types[] = self::T_WORD;
+            $values[] = substr($css, $start, $i - $start);
         }
-        return false;
+        return [$types, $values];
     }
 
     private function optimizeZeroUnits(string $val): string
@@ -395,9 +560,12 @@ final class MinifyCSS extends AbstractCacheDriver
         if (!str_starts_with($val, "0")) {
             return $val;
         }
+        // "0" followed only by unit characters, e.g. 0px or 0%
+        $len = strlen($val);
         if (
-            preg_match('/^0([a-z%]+)$/i', $val, $m) &&
-            !isset(self::PRESERVED_UNITS[strtolower($m[1])])
+            $len > 1 &&
+            strspn($val, self::UNIT_CHARS, 1) === $len - 1 &&
+            !isset(self::PRESERVED_UNITS[strtolower(substr($val, 1))])
         ) {
             return "0";
         }
@@ -425,23 +593,24 @@ final class MinifyCSS extends AbstractCacheDriver
         $style,
         string $handle,
         array $excluded,
+        string $siteUrl,
     ): bool {
         if (!isset($style->src) || empty($style->src)) {
             return false;
         }
         $src = $style->src;
         return strpos($src, ".min.css") === false &&
-            strpos($src, site_url()) !== false &&
-            !in_array($handle, $excluded) &&
+            strpos($src, $siteUrl) !== false &&
+            !isset($excluded[$handle]) &&
             !$this->isExcluded($src);
     }
-    private function getSourcePath($style): ?string
+    private function getSourcePath($style, string $siteUrl): ?string
     {
         if (!isset($style->src)) {
             return null;
         }
         $path = str_replace(
-            [site_url(), "wp-content"],
+            [$siteUrl, "wp-content"],
             [ABSPATH, "wp-content"],
             $style->src,
         );
@@ -454,9 +623,12 @@ final class MinifyCSS extends AbstractCacheDriver
         }
         return null;
     }
-    private function updateStyleRegistration($style, string $file): void
-    {
-        $style->src = str_replace(ABSPATH, site_url("/"), $file);
+    private function updateStyleRegistration(
+        $style,
+        string $file,
+        string $siteUrl,
+    ): void {
+        $style->src = str_replace(ABSPATH, $siteUrl . "/", $file);
         $style->ver = filemtime($file);
     }
     private function getCacheFile(string $key): string
@@ -0,0 +1,128 @@
+<?php
+
+declare(strict_types=1);
+
+/**
+ * Checks that MinifyCSS::scanTokens() produces the same tokens as
+ * MinifyCSS::TOKEN_REGEX. The scanner only runs after a PCRE error, so
+ * nothing else exercises it; run this after editing either lexer.
+ *
+ * Usage: php tools/check-css-lexers.php [file.css ...]
+ *
+ * The corpus is the given stylesheets (the plugin's own by default) plus
+ * a fixed-seed set of random inputs built from CSS fragments and single
+ * characters, including unterminated strings and comments.
+ */
+
+namespace WPSCache\Cache\Drivers;
+
+const RANDOM_CASES = 20000;
+
+$root = dirname(__DIR__) . "/WPS-Cache/";
+require_once $root . "src/Cache/Drivers/CacheDriverInterface.php";
+require_once $root . "src/Cache/Drivers/AbstractCacheDriver.php";
+require_once $root . "src/Cache/Drivers/MinifyCSS.php";
+
+$files = array_slice($argv, 1) ?: glob($root . "assets/css/*.css");
+$corpus = [];
+foreach ($files as $file) {
+    $corpus[$file] = file_get_contents($file);
+}
+
+$chars = str_split(" \t\n\r\v\f{}():;,>+~/*!\\\"'#%-._09azAZ");
+$fragments = [
+    "a",
+    ".x",
+    "#AABBCC",
+    "#abc",
+    "0",
+    "0px",
+    "0s",
+    "1px",
+    "2n+1",
+    "@media",
+    " and ",
+    "not ",
+    ":not(",
+    ":is(",
+    "nth-child(",
+    "calc(",
+    "VAR(",
+    "Clamp(",
+    "url(",
+    "x.png",
+    "a/b",
+    "(",
+    ")",
+    "{",
+    "}",
+    ":",
+    ";",
+    ",",
+    ">",
+    "~",
+    "+",
+    "-",
+    " ",
+    "  ",
+    "\n",
+    "/* c */",
+    "/*! k */",
+    "/*",
+    "*/",
+    "'s'",
+    '"d"',
+    "'",
+    '"',
+    "\\",
+];
+mt_srand(1);
+for ($n = 0; $n < RANDOM_CASES; $n++) {
+    $pool = $n % 2 ? $fragments : $chars;
+    $css = "";
+    for ($k = mt_rand(0, 40); $k > 0; $k--) {
+        $css .= $pool[mt_rand(0, count($pool) - 1)];
+    }
+    $corpus["random #$n"] = $css;
+}
+
+$minifier = (new \ReflectionClass(
+    MinifyCSS::class,
+))->newInstanceWithoutConstructor();
+$lexBoth = \Closure::bind(
+    function (string $css): array {
+        if (preg_match_all(self::TOKEN_REGEX, $css, $m) === false) {
+            throw new \RuntimeException(preg_last_error_msg());
+        }
+        $regex = [array_map("intval", $m["MARK"] ?? []), $m[0]];
+        return [$regex, $this->scanTokens($css)];
+    },
+    $minifier,
+    MinifyCSS::class,
+);
+
+$failed = 0;
+foreach ($corpus as $name => $css) {
+    [$regex, $scanned] = $lexBoth($css);
+    if ($regex === $scanned) {
+        continue;
+    }
+    $failed++;
+    $at = 0;
+    while (
+        ($regex[0][$at] ?? null) === ($scanned[0][$at] ?? null) &&
+        ($regex[1][$at] ?? null) === ($scanned[1][$at] ?? null)
+    ) {
+        $at++;
+    }
+    printf(
+        "%s: token %d differs, regex %s, scanner %s\n  input %s\n",
+        $name,
+        $at,
+        json_encode([$regex[0][$at] ?? null, $regex[1][$at] ?? null]),
+        json_encode([$scanned[0][$at] ?? null, $scanned[1][$at] ?? null]),
+        json_encode($css),
+    );
+}
+printf("%d of %d inputs differ\n", $failed, count($corpus));
+exit($failed > 0 ? 1 : 0);